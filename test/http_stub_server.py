@@ -1,83 +1,212 @@
 """Lightweight HTTP stub for LLM/embedding endpoints used in tests."""
 
+import asyncio
+import collections
 import json
+import socket
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from socketserver import ThreadingMixIn
 
+try:
+    import orjson
 
-class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
-    daemon_threads = True
+    def _dumps(obj):
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
 
 
 class StubLLMServer:
-    """HTTP stub that can answer chat completions and embedding requests."""
-
-    def __init__(self, chat_response=None, embedding_response=None):
-        self.chat_response = chat_response or self._default_chat_response
-        self.embedding_response = embedding_response or self._default_embedding_response
-        self.requests = []
-
-        server_self = self
-
-        class Handler(BaseHTTPRequestHandler):
-            def do_POST(self_inner):
-                length = int(self_inner.headers.get("Content-Length", "0"))
-                body = (self_inner.rfile.read(length).decode("utf-8")
-                        if length > 0 else "")
-                server_self.requests.append((self_inner.path, body))
-
-                if self_inner.path.endswith("/chat/completions"):
-                    response_body = server_self._render_chat_response(self_inner.path, body)
-                elif self_inner.path.endswith("/embeddings"):
-                    response_body = server_self._render_embedding_response(self_inner.path, body)
-                else:
-                    response_body = {"error": "unhandled path"}
-
-                payload = (response_body if isinstance(response_body, str)
-                           else json.dumps(response_body))
-
-                self_inner.send_response(200)
-                self_inner.send_header("Content-Type", "application/json")
-                self_inner.send_header("Content-Length", str(len(payload.encode("utf-8"))))
-                self_inner.end_headers()
-                self_inner.wfile.write(payload.encode("utf-8"))
-
-            def log_message(self_inner, format, *args):
-                return
-
-        self._httpd = ThreadedHTTPServer(("127.0.0.1", 0), Handler)
-        self.port = self._httpd.server_address[1]
+    """HTTP stub that can answer chat completions and embedding requests.
+
+    All connections are multiplexed on a single asyncio event loop running in
+    a background thread, so concurrent requests share one loop instead of
+    paying a thread spawn per connection.
+    """
+
+    # The defaults are plain constants, not callables: a default-constructed
+    # stub then serves pre-encoded bytes and never needs the request body,
+    # so the decode-skip and cached-payload fast paths both apply.
+    DEFAULT_CHAT_RESPONSE = {
+        "choices": [
+            {"message": {"content": "{\"status\": \"ok\"}"}}
+        ]
+    }
+    DEFAULT_EMBEDDING_RESPONSE = {"data": [{"embedding": [0.1, 0.2, 0.3]}]}
+
+    def __init__(self, chat_response=None, embedding_response=None,
+                 capture_bodies=False, max_connections=64):
+        self.chat_response = (chat_response if chat_response is not None
+                              else self.DEFAULT_CHAT_RESPONSE)
+        self.embedding_response = (embedding_response if embedding_response is not None
+                                   else self.DEFAULT_EMBEDDING_RESPONSE)
+        self.capture_bodies = capture_bodies
+        # Decoding the request body is only worth paying for when a test
+        # inspects it or a callable responder consumes it.
+        self._needs_body = (capture_bodies
+                            or callable(self.chat_response)
+                            or callable(self.embedding_response))
+        # Resolve the static-vs-callable branch once so the per-request
+        # path is a single call that yields payload bytes.
+        self._chat_payload = self._make_responder(self.chat_response)
+        self._embedding_payload = self._make_responder(self.embedding_response)
+        self._error_payload = self._make_responder({"error": "unhandled path"})
+        # Exact-path fast dispatch for the common OpenAI-style routes; the
+        # endswith scan only runs once per previously unseen path.
+        self._routes = {
+            "/chat/completions": self._chat_payload,
+            "/v1/chat/completions": self._chat_payload,
+            "/embeddings": self._embedding_payload,
+            "/v1/embeddings": self._embedding_payload,
+        }
+        # Bounded so a long or chatty run can never grow the log without
+        # limit; deque appends are O(1) and thread-safe.
+        self.requests = collections.deque(maxlen=10_000)
+        # Bounds concurrently served connections so a runaway client cannot
+        # pile up unbounded coroutine state; excess connections queue in
+        # the accept backlog.
+        self._conn_limit = asyncio.Semaphore(max_connections)
+
+        # Bind the listening socket ourselves so the loopback options are
+        # explicit: ports are reusable across quick stub restarts and Nagle
+        # never delays the small request/response exchanges. tinymem talks
+        # plain http:// URLs, so loopback TCP (not AF_UNIX) is required.
+        listen_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listen_sock.bind(("127.0.0.1", 0))
+        except BaseException:
+            listen_sock.close()
+            raise
+
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_connection, sock=listen_sock)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
         self.base_url = f"http://127.0.0.1:{self.port}"
         self._thread = None
 
-    def _render_chat_response(self, path, body):
-        if callable(self.chat_response):
-            return self.chat_response(path, body)
-        return self.chat_response
-
-    def _render_embedding_response(self, path, body):
-        if callable(self.embedding_response):
-            return self.embedding_response(path, body)
-        return self.embedding_response
-
-    @staticmethod
-    def _default_chat_response(path, body):
-        return {
-            "choices": [
-                {"message": {"content": "{\"status\": \"ok\"}"}}
-            ]
-        }
+    async def _handle_connection(self, reader, writer):
+        conn_sock = writer.get_extra_info("socket")
+        if conn_sock is not None:
+            conn_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            async with self._conn_limit:
+                await self._serve_requests(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # stop() cancels open handlers; ending the task quietly here
+            # keeps asyncio's stream-protocol callback from logging the
+            # cancellation as an unhandled exception.
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_requests(self, reader, writer):
+        # Keep-alive loop: one connection serves a whole burst of
+        # requests; deterministic Content-Length framing on both sides
+        # makes that safe.
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                path = request_line.split()[1].decode("ascii")
+            except (IndexError, UnicodeDecodeError):
+                break
+
+            length = 0
+            close_requested = False
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.partition(b":")
+                name = name.strip().lower()
+                if name == b"content-length":
+                    length = int(value.strip())
+                elif name == b"connection":
+                    close_requested = value.strip().lower() == b"close"
+
+            # The body must always be drained to keep the keep-alive
+            # framing intact; the decode is skipped when nothing reads it.
+            raw_body = await reader.readexactly(length)
+            body = raw_body.decode("utf-8") if self._needs_body else ""
+            self.requests.append((path, body if self.capture_bodies else None))
+
+            responder = self._routes.get(path)
+            if responder is None:
+                if path.endswith("/chat/completions"):
+                    responder = self._chat_payload
+                elif path.endswith("/embeddings"):
+                    responder = self._embedding_payload
+                else:
+                    responder = self._error_payload
+                self._routes[path] = responder
+            payload_bytes = responder(path, body)
+
+            # Status line, headers and body go out as one buffer so the
+            # whole response is a single write to the transport.
+            connection = "close" if close_requested else "keep-alive"
+            head = ("HTTP/1.1 200 OK\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload_bytes)}\r\n"
+                    f"Connection: {connection}\r\n\r\n").encode("ascii")
+            writer.write(head + payload_bytes)
+            await writer.drain()
+            if close_requested:
+                break
 
     @staticmethod
-    def _default_embedding_response(path, body):
-        return {"data": [{"embedding": [0.1, 0.2, 0.3]}]}
+    def _encode_payload(response_body):
+        if isinstance(response_body, (bytes, bytearray)):
+            return bytes(response_body)
+        if isinstance(response_body, str):
+            return response_body.encode("utf-8")
+        return _dumps(response_body)
+
+    @classmethod
+    def _make_responder(cls, response):
+        """Return a (path, body) -> payload bytes function for a response.
+
+        Static responses close over their pre-encoded bytes; callables
+        encode whatever they return per request.
+        """
+        if callable(response):
+            return lambda path, body: cls._encode_payload(response(path, body))
+        payload = cls._encode_payload(response)
+        return lambda path, body: payload
 
     def start(self):
-        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
 
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _shutdown(self):
+        # Open keep-alive connections leave their handler tasks pending;
+        # cancel them and let the loop drain the cancellations before
+        # stopping, otherwise closing the loop destroys pending tasks and
+        # dumps "Task was destroyed but it is pending!" onto stderr.
+        self._server.close()
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+
+        async def _drain():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop.stop()
+
+        self._loop.create_task(_drain())
+
     def stop(self):
-        self._httpd.shutdown()
         if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
             self._thread.join(timeout=1)
+        else:
+            self._server.close()
+        self._loop.close()
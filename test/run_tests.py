@@ -9,37 +9,39 @@ import os
 import sys
 import subprocess
 import unittest
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from test import support
+
 
 def build_tinymem():
-    """Build the tinymem binary if it doesn't exist"""
+    """Build the tinymem binary if it is missing or older than the sources"""
     tinymem_path = Path(__file__).parent / "tinymem"
-    
-    if not tinymem_path.exists():
+
+    if support.go_sources_newer(tinymem_path, ROOT_DIR):
         print("Building tinymem binary...")
-        result = subprocess.run([
-            "go", "build", "-tags", "fts5", "-o", str(tinymem_path), 
-            "./cmd/tinymem"
-        ], cwd=Path(__file__).parent)
-        
-        if result.returncode != 0:
-            print(f"Failed to build tinymem: {result.stderr}")
+        ok, stderr = support.build_tinymem(tinymem_path, ROOT_DIR)
+        if not ok:
+            print(f"Failed to build tinymem: {stderr}")
             return False
-    
+
     return True
 
 
 def run_individual_test_suite(test_file):
-    """Run an individual test suite file"""
-    print(f"\n{'='*60}")
-    print(f"RUNNING TEST SUITE: {test_file}")
-    print(f"{'='*60}")
-    
-    result = subprocess.run([sys.executable, test_file], 
-                          cwd=Path(__file__).parent)
-    
-    return result.returncode == 0
+    """Run an individual test suite file, capturing its combined output"""
+    result = subprocess.run([sys.executable, test_file],
+                          cwd=Path(__file__).parent,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT,
+                          text=True)
+
+    return result.returncode == 0, result.stdout
 
 
 def main():
@@ -67,22 +69,32 @@ def main():
             print(f"ERROR: Test file {test_suite} does not exist")
             sys.exit(1)
     
-    # Run each test suite
+    # Run the suites concurrently - each uses its own temp dirs, and the
+    # work is dominated by waiting on child processes, so threads suffice.
     all_passed = True
     results = {}
-    
-    for test_suite in test_suites:
-        success = run_individual_test_suite(test_suite)
-        results[test_suite] = success
-        all_passed = all_passed and success
+
+    with ThreadPoolExecutor(max_workers=len(test_suites)) as executor:
+        futures = {executor.submit(run_individual_test_suite, t): t
+                   for t in test_suites}
+        for future in as_completed(futures):
+            test_suite = futures[future]
+            success, output = future.result()
+            results[test_suite] = success
+            all_passed = all_passed and success
+
+            print(f"\n{'='*60}")
+            print(f"TEST SUITE: {test_suite}")
+            print(f"{'='*60}")
+            print(output, end="")
     
     # Print summary
     print(f"\n{'='*60}")
     print("TEST SUITE SUMMARY")
     print(f"{'='*60}")
     
-    for test_suite, success in results.items():
-        status = "PASS" if success else "FAIL"
+    for test_suite in test_suites:
+        status = "PASS" if results[test_suite] else "FAIL"
         print(f"{test_suite:<30} {status}")
     
     print(f"\nOverall Result: {'ALL TESTS PASSED' if all_passed else 'SOME TESTS FAILED'}")
@@ -0,0 +1,195 @@
+"""Shared helpers for the TinyMem test suites."""
+
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+
+    def json_dumps(obj):
+        """Serialize to UTF-8 bytes (orjson when available, stdlib otherwise)."""
+        return orjson.dumps(obj)
+
+    json_loads = orjson.loads
+except ImportError:
+    import json
+
+    def json_dumps(obj):
+        """Serialize to UTF-8 bytes (orjson when available, stdlib otherwise)."""
+        return json.dumps(obj).encode("utf-8")
+
+    json_loads = json.loads
+
+# Base directory for test temp dirs. Prefer tmpfs so SQLite commits and
+# git/teardown I/O stay in RAM; None falls back to the platform default
+# (e.g. on macOS, where /dev/shm does not exist).
+TMP_BASE = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+def require_tinymem():
+    """Return the tinymem binary path, skipping the caller's suite if absent.
+
+    Building is run_tests.py's job; a missing binary raises SkipTest
+    instead of pulling a Go compile into the test fixtures. Call this
+    before allocating any class fixtures - tearDownClass does not run
+    when setUpClass raises, so anything created earlier would leak.
+    """
+    path = os.path.join(os.path.dirname(__file__), "tinymem")
+    if not os.path.exists(path):
+        raise unittest.SkipTest(
+            f"tinymem binary missing at {path}; run test/run_tests.py or "
+            "'go build -tags fts5 -o test/tinymem ./cmd/tinymem' first")
+    return path
+
+
+def make_git_template():
+    """Build a template git repo once; tests copy its .git skeleton per dir"""
+    template = tempfile.mkdtemp(prefix="tinymem_git_template_", dir=TMP_BASE)
+    git_opts = {"check": True, "cwd": template,
+                "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    subprocess.run(["git", "init"], **git_opts)
+    subprocess.run(["git", "config", "user.email", "test@example.com"], **git_opts)
+    subprocess.run(["git", "config", "user.name", "Test User"], **git_opts)
+    return template
+
+
+def copy_git_template(template, target_dir):
+    """Copy the template's .git skeleton so TinyMem can detect a project root"""
+    shutil.copytree(os.path.join(template, ".git"),
+                    os.path.join(target_dir, ".git"))
+
+
+def go_sources_newer(binary_path, repo_root):
+    """Return True when the Go sources are newer than the built binary.
+
+    Compares the binary's mtime against every .go file under cmd/ and
+    internal/ plus go.mod/go.sum; a missing binary always counts as stale.
+    """
+    if not os.path.exists(binary_path):
+        return True
+    built = os.path.getmtime(str(binary_path))
+    repo_root = str(repo_root)
+    candidates = [os.path.join(repo_root, "go.mod"),
+                  os.path.join(repo_root, "go.sum")]
+    for subdir in ("cmd", "internal"):
+        for dirpath, _dirnames, filenames in os.walk(os.path.join(repo_root, subdir)):
+            candidates.extend(os.path.join(dirpath, name)
+                              for name in filenames if name.endswith(".go"))
+    for path in candidates:
+        try:
+            if os.path.getmtime(path) > built:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def build_tinymem(binary_path, repo_root):
+    """(Re)build the tinymem binary when the Go sources are newer.
+
+    Compiles in parallel across cores with a persistent build cache, so a
+    repeat build on unchanged sources is close to a no-op even when the
+    mtime gate misfires. Returns (success, stderr text).
+    """
+    if not go_sources_newer(binary_path, repo_root):
+        return True, ""
+    env = dict(os.environ)
+    env.setdefault("GOCACHE", os.path.expanduser("~/.cache/go-build"))
+    result = subprocess.run(
+        ["go", "build", "-tags", "fts5", "-p", str(os.cpu_count() or 1),
+         "-o", str(binary_path), "./cmd/tinymem"],
+        cwd=str(repo_root), capture_output=True, text=True, env=env)
+    return result.returncode == 0, result.stderr
+
+
+_cleanup_queue = queue.Queue()
+_cleanup_thread = None
+_cleanup_lock = threading.Lock()
+_cleanup_seq = itertools.count()
+
+
+def _drain_cleanup_queue():
+    while True:
+        doomed = _cleanup_queue.get()
+        shutil.rmtree(doomed, ignore_errors=True)
+        _cleanup_queue.task_done()
+
+
+def rmtree_in_background(path):
+    """Delete a directory tree off the caller's critical path.
+
+    The tree is moved aside with a single rename so the path is free
+    immediately; a shared daemon thread walks and unlinks it while the
+    next test is already setting up. Call flush_cleanup() before the
+    process exits to make sure nothing is left behind.
+    """
+    global _cleanup_thread
+    doomed = f"{path}.deleting.{next(_cleanup_seq)}"
+    try:
+        os.rename(path, doomed)
+    except FileNotFoundError:
+        return
+    except OSError:
+        doomed = path
+    with _cleanup_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_drain_cleanup_queue,
+                                               daemon=True)
+            _cleanup_thread.start()
+    _cleanup_queue.put(doomed)
+
+
+def flush_cleanup():
+    """Block until every queued background deletion has finished."""
+    _cleanup_queue.join()
+
+
+def run_parallel(test_case, workers=None):
+    """Run a TestCase's test methods concurrently on a thread pool.
+
+    Only safe for cases whose tests never touch process-wide state (cwd,
+    os.environ); each test method runs on its own instance with its own
+    TestResult. Class fixtures run once around the pool, as a TestSuite
+    would do. Returns True when every test passed.
+    """
+    names = unittest.TestLoader().getTestCaseNames(test_case)
+    if workers is None:
+        # The tests mostly wait on subprocess I/O, so more workers than
+        # cores still pays off.
+        workers = min(len(names), max(4, os.cpu_count() or 1))
+
+    def run_one(name):
+        result = unittest.TestResult()
+        test_case(name)(result)
+        return name, result
+
+    problems = []
+    try:
+        test_case.setUpClass()
+    except unittest.SkipTest as exc:
+        print(f"{test_case.__name__} ... skipped ({exc})", flush=True)
+        return True
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name, result in executor.map(run_one, names):
+                if result.skipped:
+                    print(f"{name} ... skipped ({result.skipped[0][1]})", flush=True)
+                elif result.wasSuccessful():
+                    print(f"{name} ... ok", flush=True)
+                else:
+                    print(f"{name} ... FAIL", flush=True)
+                    problems.extend((name, tb) for _t, tb in
+                                    result.failures + result.errors)
+    finally:
+        test_case.tearDownClass()
+
+    for name, traceback_text in problems:
+        print(f"\n{'=' * 70}\nFAIL: {name}\n{'-' * 70}\n{traceback_text}")
+
+    return not problems
@@ -18,6 +18,7 @@ import shutil
 import subprocess
 import json
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -25,47 +26,58 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from test.http_stub_server import StubLLMServer
+from test.support import (TMP_BASE, copy_git_template, flush_cleanup,
+                          make_git_template, require_tinymem,
+                          rmtree_in_background)
 
 
 class TinyMemTestCase(unittest.TestCase):
     """Base test case for TinyMem tests"""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """Resolve the binary and build the shared git template once"""
+        cls.tinymem_path = require_tinymem()
+        cls._git_template = make_git_template()
+
+        # Snapshot the environment once; per-call copies happen only
+        # when a test supplies overrides
+        cls._base_env = dict(os.environ)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._git_template, ignore_errors=True)
+        flush_cleanup()
+
     def setUp(self):
         """Set up test environment with temporary directory"""
-        self.original_cwd = os.getcwd()
-        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_test_")
-        os.chdir(self.temp_dir)
-        
+        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_test_", dir=TMP_BASE)
+
         # Initialize a git repo to ensure TinyMem can detect project root
-        subprocess.run(["git", "init"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.email", "test@example.com"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.name", "Test User"], check=True, capture_output=True)
-        
-        # Path to tinymem binary (assuming it's in the project root)
-        self.tinymem_path = os.path.join(os.path.dirname(__file__), "tinymem")
-        
-        # Verify tinymem binary exists
-        if not os.path.exists(self.tinymem_path):
-            # Try to build it
-            build_result = subprocess.run([
-                "go", "build", "-tags", "fts5", "-o", self.tinymem_path, 
-                "./cmd/tinymem"
-            ], cwd=os.path.dirname(__file__))
-            if build_result.returncode != 0:
-                raise RuntimeError(f"Could not build tinymem binary: {build_result.stderr}")
-    
+        copy_git_template(self._git_template, self.temp_dir)
+
     def tearDown(self):
         """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        rmtree_in_background(self.temp_dir)
     
-    def run_tinymem_cmd(self, args, expected_exit_code=0, env=None):
-        """Helper to run tinymem command and return result"""
+    def run_tinymem_cmd(self, args, expected_exit_code=0, env=None, cwd=None):
+        """Helper to run tinymem command and return result
+
+        Each call deliberately spawns a fresh process: these tests cover the
+        CLI layer itself (flag parsing, exit codes, per-invocation env), which
+        a persistent stdio session such as `tinymem mcp` cannot exercise.
+        """
         cmd = [self.tinymem_path] + args
-        full_env = os.environ.copy()
         if env:
-            full_env.update(env)
-        result = subprocess.run(cmd, capture_output=True, text=True, env=full_env)
+            full_env = {**self._base_env, **env}
+        else:
+            # subprocess treats the env mapping as read-only, so the
+            # shared snapshot can be passed as-is
+            full_env = self._base_env
+        # An explicit cwd keeps project-root detection per command without
+        # touching process-wide state, so tests can run concurrently
+        result = subprocess.run(cmd, capture_output=True, text=True, env=full_env,
+                                cwd=cwd or self.temp_dir)
 
         if expected_exit_code is not None:
             self.assertEqual(result.returncode, expected_exit_code,
@@ -149,25 +161,19 @@ class TinyMemTestCase(unittest.TestCase):
     def test_persistence_isolation(self):
         """Test project-scoped separation"""
         # Create a second temporary directory for comparison
-        with tempfile.TemporaryDirectory() as temp_dir2:
-            os.chdir(temp_dir2)
-            subprocess.run(["git", "init"], check=True, capture_output=True)
-            subprocess.run(["git", "config", "user.email", "test@example.com"], check=True, capture_output=True)
-            subprocess.run(["git", "config", "user.name", "Test User"], check=True, capture_output=True)
-            
+        with tempfile.TemporaryDirectory(dir=TMP_BASE) as temp_dir2:
+            copy_git_template(self._git_template, temp_dir2)
+
             # Write a memory in second project
             result = self.run_tinymem_cmd([
                 "write", "--type", "note", "--summary", "Second project note"
-            ])
+            ], cwd=temp_dir2)
             self.assertIn("Memory created successfully!", result.stdout)
             
             # Query in second project
-            result = self.run_tinymem_cmd(["query", "second"])
+            result = self.run_tinymem_cmd(["query", "second"], cwd=temp_dir2)
             self.assertIn("Second project note", result.stdout)
         
-        # Go back to original directory
-        os.chdir(self.temp_dir)
-        
         # Query in original project - should not find second project's memory
         result = self.run_tinymem_cmd(["query", "second"])
         self.assertNotIn("Second project note", result.stdout)
@@ -218,12 +224,31 @@ class TinyMemTestCase(unittest.TestCase):
     def test_memory_types_valid(self):
         """Test all valid memory types can be created"""
         valid_types = ["claim", "plan", "decision", "constraint", "observation", "note"]
-        
-        for mem_type in valid_types:
+
+        # Each write is an independent subprocess and the GIL drops while
+        # waiting on it, so the invocations can overlap. The first write
+        # runs alone so a single process creates the DB and applies the
+        # schema migration; concurrent migrations of a fresh DB race on
+        # the read-then-write migration transaction and fail with
+        # SQLITE_BUSY_SNAPSHOT, which the busy timeout does not retry.
+        # Once the schema exists, WAL mode and the busy timeout serialize
+        # the remaining plain writers safely. The CLI has no batch/
+        # multi-write form, so overlapping separate invocations is as
+        # close as this test can get to a single call - and separate
+        # processes are the point here, since each type must be accepted
+        # by a fresh `write` invocation.
+        def write_type(mem_type):
+            return self.run_tinymem_cmd([
+                "write", "--type", mem_type, "--summary", f"Test {mem_type}"
+            ], expected_exit_code=None)
+
+        results = [write_type(valid_types[0])]
+        with ThreadPoolExecutor(max_workers=len(valid_types) - 1) as executor:
+            results.extend(executor.map(write_type, valid_types[1:]))
+
+        for mem_type, result in zip(valid_types, results):
             with self.subTest(mem_type=mem_type):
-                result = self.run_tinymem_cmd([
-                    "write", "--type", mem_type, "--summary", f"Test {mem_type}"
-                ])
+                self.assertEqual(result.returncode, 0, result.stderr)
                 self.assertIn("Memory created successfully!", result.stdout)
     
     def test_memory_types_invalid(self):
@@ -289,7 +314,7 @@ class TinyMemTestCase(unittest.TestCase):
 - [ ] Sample Task
   - [x] Confirm dashboard reads tinyTasks
 """
-        with open("tinyTasks.md", "w") as f:
+        with open(os.path.join(self.temp_dir, "tinyTasks.md"), "w") as f:
             f.write(task_content.strip() + "\n")
 
         env = {
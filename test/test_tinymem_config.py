@@ -14,47 +14,62 @@ import json
 import unittest
 from pathlib import Path
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from test.support import (TMP_BASE, copy_git_template, flush_cleanup,
+                          make_git_template, require_tinymem,
+                          rmtree_in_background)
+
 
 class TinyMemConfigTestCase(unittest.TestCase):
     """Test case for TinyMem configuration and environment variables"""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """Resolve the binary and build the shared git template once"""
+        cls.tinymem_path = require_tinymem()
+        cls._git_template = make_git_template()
+
+        # Snapshot the environment once; per-call copies happen only
+        # when a test supplies overrides
+        cls._base_env = dict(os.environ)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._git_template, ignore_errors=True)
+        flush_cleanup()
+
     def setUp(self):
         """Set up test environment with temporary directory"""
-        self.original_cwd = os.getcwd()
-        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_config_test_")
-        os.chdir(self.temp_dir)
-        
+        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_config_test_", dir=TMP_BASE)
+
         # Initialize a git repo to ensure TinyMem can detect project root
-        subprocess.run(["git", "init"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.email", "test@example.com"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.name", "Test User"], check=True, capture_output=True)
-        
-        # Path to tinymem binary
-        self.tinymem_path = os.path.join(os.path.dirname(__file__), "tinymem")
-        
-        # Verify tinymem binary exists
-        if not os.path.exists(self.tinymem_path):
-            # Try to build it
-            build_result = subprocess.run([
-                "go", "build", "-tags", "fts5", "-o", self.tinymem_path, 
-                "./cmd/tinymem"
-            ], cwd=os.path.dirname(__file__))
-            if build_result.returncode != 0:
-                raise RuntimeError(f"Could not build tinymem binary: {build_result.stderr}")
-    
+        copy_git_template(self._git_template, self.temp_dir)
+
     def tearDown(self):
         """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        rmtree_in_background(self.temp_dir)
     
-    def run_tinymem_cmd(self, args, env=None, expected_exit_code=0):
-        """Helper to run tinymem command with custom environment"""
+    def run_tinymem_cmd(self, args, env=None, expected_exit_code=0, cwd=None):
+        """Helper to run tinymem command with custom environment
+
+        Each call deliberately spawns a fresh process: these tests vary the
+        environment per invocation, which a persistent stdio session cannot do.
+        """
         cmd = [self.tinymem_path] + args
-        full_env = os.environ.copy()
         if env:
-            full_env.update(env)
+            full_env = {**self._base_env, **env}
+        else:
+            # subprocess treats the env mapping as read-only, so the
+            # shared snapshot can be passed as-is
+            full_env = self._base_env
         
-        result = subprocess.run(cmd, capture_output=True, text=True, env=full_env)
+        # An explicit cwd keeps project-root detection per command without
+        # touching process-wide state, so tests can run concurrently
+        result = subprocess.run(cmd, capture_output=True, text=True, env=full_env,
+                                cwd=cwd or self.temp_dir)
         
         if expected_exit_code is not None:
             self.assertEqual(result.returncode, expected_exit_code,
@@ -169,25 +184,21 @@ level = "debug"
         self.assertIn("Memory created successfully!", result.stdout)
         
         # Create another temporary directory for a different project
-        with tempfile.TemporaryDirectory() as temp_dir_b:
-            os.chdir(temp_dir_b)
-            subprocess.run(["git", "init"], check=True, capture_output=True)
-            subprocess.run(["git", "config", "user.email", "test@example.com"], check=True, capture_output=True)
-            subprocess.run(["git", "config", "user.name", "Test User"], check=True, capture_output=True)
-            
+        with tempfile.TemporaryDirectory(dir=TMP_BASE) as temp_dir_b:
+            copy_git_template(self._git_template, temp_dir_b)
+
             # Write a memory in project B
             result = self.run_tinymem_cmd([
                 "write", "--type", "note", "--summary", "Project B note"
-            ])
+            ], cwd=temp_dir_b)
             self.assertIn("Memory created successfully!", result.stdout)
             
             # Query in project B - should only find B's memory
-            result = self.run_tinymem_cmd(["query", "note"])
+            result = self.run_tinymem_cmd(["query", "note"], cwd=temp_dir_b)
             self.assertIn("Project B note", result.stdout)
             self.assertNotIn("Project A note", result.stdout)
         
         # Back in original project, should only find A's memory
-        os.chdir(self.temp_dir)
         result = self.run_tinymem_cmd(["query", "note"])
         self.assertIn("Project A note", result.stdout)
         self.assertNotIn("Project B note", result.stdout)
@@ -6,6 +6,7 @@ This test suite covers MCP tool handlers and their functionality.
 """
 
 import os
+import select
 import sys
 import tempfile
 import shutil
@@ -14,6 +15,7 @@ import json
 import unittest
 import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -21,55 +23,142 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from test.http_stub_server import StubLLMServer
+from test.support import (TMP_BASE, copy_git_template, flush_cleanup,
+                          json_dumps, json_loads, make_git_template,
+                          require_tinymem, run_parallel, rmtree_in_background)
 
 
 class TinyMemMCPTestCase(unittest.TestCase):
     """Test case for TinyMem MCP functionality"""
-    
+
+    # Ceiling on how long one request/response exchange may take; a hung
+    # server fails the test instead of stalling the whole run.
+    RESPONSE_TIMEOUT = 10.0
+
+    @classmethod
+    def setUpClass(cls):
+        """Build fixtures shared by every test: git template and binary"""
+        cls.tinymem_path = require_tinymem()
+        cls._git_template = make_git_template()
+
+        # Cache for static server metadata (initialize, ping, tools/list):
+        # deterministic for a given binary, so one round trip per run is
+        # enough no matter how many tests assert on it.
+        cls._metadata_cache = {}
+        cls._metadata_lock = threading.Lock()
+
+        # One stub LLM server shared by every test that needs one; tests
+        # install their responder through _stub_chat, which serializes the
+        # stub's users against each other under the lock.
+        cls._stub_callback = None
+        cls._stub_lock = threading.Lock()
+        try:
+            cls._stub = StubLLMServer(chat_response=cls._dispatch_stub_chat)
+        except PermissionError:
+            cls._stub = None
+        else:
+            cls._stub.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._stub is not None:
+            cls._stub.stop()
+        shutil.rmtree(cls._git_template, ignore_errors=True)
+        flush_cleanup()
+
+    @classmethod
+    def _dispatch_stub_chat(cls, path, body):
+        responder = cls._stub_callback
+        if responder is None:
+            return StubLLMServer.DEFAULT_CHAT_RESPONSE
+        return responder(path, body)
+
+    @contextmanager
+    def _stub_chat(self, responder):
+        """Reserve the shared stub with a per-test chat responder installed"""
+        if self._stub is None:
+            self.skipTest("Cannot bind stub server")
+        cls = type(self)
+        with cls._stub_lock:
+            cls._stub_callback = responder
+            try:
+                yield self._stub.base_url
+            finally:
+                cls._stub_callback = None
+
     def setUp(self):
         """Set up test environment with temporary directory"""
-        self.original_cwd = os.getcwd()
-        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_mcp_test_")
-        os.chdir(self.temp_dir)
-        
+        self.temp_dir = tempfile.mkdtemp(prefix="tinymem_mcp_test_", dir=TMP_BASE)
+
         # Initialize a git repo to ensure TinyMem can detect project root
-        subprocess.run(["git", "init"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.email", "test@example.com"], check=True, capture_output=True)
-        subprocess.run(["git", "config", "user.name", "Test User"], check=True, capture_output=True)
-        
-        # Path to tinymem binary (next to this test file)
-        test_dir = Path(__file__).resolve().parent
-        repo_root = test_dir.parent
-        self.tinymem_path = str(test_dir / "tinymem")
-        
-        # Verify tinymem binary exists
-        if not os.path.exists(self.tinymem_path):
-            # Try to build it
-            build_result = subprocess.run(
-                [
-                    "go",
-                    "build",
-                    "-tags",
-                    "fts5",
-                    "-o",
-                    self.tinymem_path,
-                    "./cmd/tinymem",
-                ],
-                cwd=repo_root,
-                capture_output=True,
-                text=True,
-            )
-            if build_result.returncode != 0:
-                stderr = build_result.stderr.strip() if build_result.stderr else "unknown build error"
-                raise RuntimeError(f"Could not build tinymem binary: {stderr}")
-    
+        copy_git_template(self._git_template, self.temp_dir)
+
+        # Persistent MCP server processes, keyed by their env overrides.
+        # MCP over stdio is a long-lived session, so one process serves
+        # every request a test sends instead of one launch per call.
+        self._mcp_procs = {}
+        self._next_id = 1
+
     def tearDown(self):
         """Clean up test environment"""
-        os.chdir(self.original_cwd)
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
+        for proc, _stderr_lines, _buf in self._mcp_procs.values():
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        rmtree_in_background(self.temp_dir)
+
+    @staticmethod
+    def _drain_stderr(proc, lines):
+        """Drain a server's stderr so the pipe can never fill and block it"""
+        for line in proc.stderr:
+            lines.append(line)
+
+    @staticmethod
+    def _stderr_text(lines):
+        """Decode captured stderr bytes for use in failure messages"""
+        return b"".join(lines).decode("utf-8", errors="replace")
+
+    def _get_mcp_proc(self, env=None):
+        """Return the persistent MCP server for an env, starting it on demand"""
+        key = tuple(sorted(env.items())) if env else None
+        entry = self._mcp_procs.get(key)
+        if entry is not None and entry[0].poll() is None:
+            return entry
+
+        full_env = os.environ.copy()
+        if env:
+            full_env.update(env)
+
+        # Binary pipes: the encoded request bytes go to the pipe as-is and
+        # response lines come back as bytes, which json_loads takes
+        # directly, so nothing is decoded or re-encoded in between. stdout
+        # is unbuffered because the read side does its own line buffering
+        # (so select() can see exactly what has not been consumed yet).
+        proc = subprocess.Popen([self.tinymem_path, "mcp"],
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               bufsize=0,
+                               cwd=self.temp_dir,
+                               env=full_env)
+        stderr_lines = []
+        threading.Thread(target=self._drain_stderr, args=(proc, stderr_lines),
+                         daemon=True).start()
+        entry = (proc, stderr_lines, bytearray())
+        self._mcp_procs[key] = entry
+        return entry
+
     def send_mcp_request(self, method, params=None, tool_name=None, tool_args=None, env=None):
-        """Send an MCP request to tinymem mcp server"""
+        """Send an MCP request to the persistent tinymem mcp server"""
+        request_id = self._next_id
+        self._next_id += 1
+
         if method == "tools/call":
             # Format for tool call
             request = {
@@ -79,49 +168,153 @@ class TinyMemMCPTestCase(unittest.TestCase):
                     "name": tool_name,
                     "arguments": tool_args or {}
                 },
-                "id": 1
+                "id": request_id
             }
         else:
             # Format for other methods
             request_obj = {
                 "jsonrpc": "2.0",
                 "method": method,
-                "id": 1
+                "id": request_id
             }
             if params:
                 request_obj["params"] = params
-            
+
             request = request_obj
-        
-        # Start MCP server in a subprocess
-        full_env = os.environ.copy()
-        if env:
-            full_env.update(env)
 
-        proc = subprocess.Popen([self.tinymem_path, "mcp"],
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE,
-                               text=True,
-                               env=full_env)
-        
-        # Send the request
-        request_json = json.dumps(request) + "\n"
-        stdout, stderr = proc.communicate(input=request_json, timeout=10)
-
-        # Clean stdout to remove diagnostic prefixes (e.g., logging from the Ralph loop)
-        clean_stdout = stdout
-        first_json = clean_stdout.find("{")
-        last_json = clean_stdout.rfind("}")
-        if first_json != -1 and last_json != -1 and last_json >= first_json:
-            clean_stdout = clean_stdout[first_json:last_json + 1]
-
-        # Parse the response
+        proc, stderr_lines, buf = self._get_mcp_proc(env)
+        try:
+            proc.stdin.write(json_dumps(request) + b"\n")
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None, f"MCP server exited\nSTDERR: {self._stderr_text(stderr_lines)}"
+
+        responses = self._read_responses(proc, buf, {request_id})
+        response = responses.get(request_id)
+        if response is None:
+            return None, (f"MCP server did not respond in time\n"
+                          f"STDERR: {self._stderr_text(stderr_lines)}")
+        return response, self._stderr_text(stderr_lines)
+
+    def send_mcp_pipeline(self, calls, env=None):
+        """Send several tools/call requests back-to-back on one session.
+
+        Every request goes out in a single write before any response is
+        read, so the server can take the next request off stdin while the
+        client is still parsing the previous answer. Returns the responses
+        in call order (None for any that never arrived) plus stderr.
+        """
+        ids = []
+        buf = bytearray()
+        for tool_name, tool_args in calls:
+            request_id = self._next_id
+            self._next_id += 1
+            ids.append(request_id)
+            buf += json_dumps({
+                "jsonrpc": "2.0",
+                "method": "tools/call",
+                "params": {
+                    "name": tool_name,
+                    "arguments": tool_args or {}
+                },
+                "id": request_id
+            }) + b"\n"
+
+        proc, stderr_lines, read_buf = self._get_mcp_proc(env)
         try:
-            response = json.loads(clean_stdout.strip())
-            return response, stderr
-        except json.JSONDecodeError:
-            return None, f"Could not parse response: {stdout}\nSTDERR: {stderr}"
+            proc.stdin.write(bytes(buf))
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            stderr = f"MCP server exited\nSTDERR: {self._stderr_text(stderr_lines)}"
+            return [None] * len(ids), stderr
+
+        responses = self._read_responses(proc, read_buf, ids)
+        return [responses.get(i) for i in ids], self._stderr_text(stderr_lines)
+
+    @classmethod
+    def _readline_bounded(cls, proc, buf, deadline):
+        """Return one stdout line, b"" on EOF, or None once the deadline hits"""
+        while True:
+            newline = buf.find(b"\n")
+            if newline >= 0:
+                line = bytes(buf[:newline + 1])
+                del buf[:newline + 1]
+                return line
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([proc.stdout], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(proc.stdout.fileno(), 65536)
+            if not chunk:
+                if buf:
+                    line = bytes(buf)
+                    buf.clear()
+                    return line
+                return b""
+            buf += chunk
+
+    def _read_responses(self, proc, buf, wanted_ids):
+        """Collect NDJSON responses until every wanted id has arrived.
+
+        The server frames messages as newline-delimited JSON (it reads
+        stdin with a line scanner and prints one response per line), so
+        read one line at a time; anything that is not JSON-RPC (e.g.
+        diagnostics on stdout) is skipped. One deadline covers the whole
+        exchange so a hung server cannot stall the run.
+        """
+        pending = set(wanted_ids)
+        responses = {}
+        deadline = time.monotonic() + self.RESPONSE_TIMEOUT
+        while pending:
+            line = self._readline_bounded(proc, buf, deadline)
+            if not line:
+                break
+            try:
+                response = json_loads(line)
+            except ValueError:
+                # A stray diagnostic can share a line with the response;
+                # retry from the first brace before discarding the line.
+                brace = line.find(b"{")
+                if brace <= 0:
+                    continue
+                try:
+                    response = json_loads(line[brace:])
+                except ValueError:
+                    continue
+            if isinstance(response, dict) and response.get("id") in pending:
+                pending.discard(response["id"])
+                responses[response["id"]] = response
+        return responses
+
+    @staticmethod
+    def _content_text(response):
+        """Join a tool response's content items into one searchable string"""
+        return " ".join(item.get("text", "")
+                        for item in response["result"]["content"])
+
+    def _assert_content_contains(self, response, *needles):
+        """Assert every needle appears in the response's content, built once"""
+        text = self._content_text(response)
+        missing = [needle for needle in needles if needle not in text]
+        self.assertFalse(missing, f"Missing from content: {missing}\nContent: {text}")
+
+    def _get_server_metadata(self, method):
+        """Fetch a static metadata response once per run and reuse it.
+
+        The first test that needs a method pays for the round trip; later
+        callers read the cached parse. Failed fetches are not cached, so a
+        flaky first attempt does not poison the rest of the run.
+        """
+        cls = type(self)
+        with cls._metadata_lock:
+            cached = cls._metadata_cache.get(method)
+            if cached is None:
+                cached = self.send_mcp_request(method)
+                if cached[0] is not None:
+                    cls._metadata_cache[method] = cached
+            return cached
 
     def _ralph_chat_response(self, path, body, patch_name):
         return {
@@ -146,12 +339,12 @@ class TinyMemMCPTestCase(unittest.TestCase):
                 {"id": "0", "confidence": 0.88, "reason": "keep"},
             ]
             return {"choices": [{"message": {"content": json.dumps(payload)}}]}
-        return StubLLMServer._default_chat_response(path, body)
+        return StubLLMServer.DEFAULT_CHAT_RESPONSE
     
     def test_mcp_initialize(self):
         """Test MCP initialize method"""
-        response, stderr = self.send_mcp_request("initialize")
-        
+        response, stderr = self._get_server_metadata("initialize")
+
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("serverInfo", response["result"])
@@ -159,7 +352,7 @@ class TinyMemMCPTestCase(unittest.TestCase):
     
     def test_mcp_ping(self):
         """Test MCP ping method"""
-        response, stderr = self.send_mcp_request("ping")
+        response, stderr = self._get_server_metadata("ping")
         
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
@@ -167,7 +360,7 @@ class TinyMemMCPTestCase(unittest.TestCase):
     
     def test_mcp_tools_list(self):
         """Test MCP tools/list method"""
-        response, stderr = self.send_mcp_request("tools/list")
+        response, stderr = self._get_server_metadata("tools/list")
         
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
@@ -199,59 +392,40 @@ class TinyMemMCPTestCase(unittest.TestCase):
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        self.assertTrue(any("Memory created successfully" in str(item.get("text", "")) 
-                           for item in response["result"]["content"]))
+        self._assert_content_contains(response, "Memory created successfully")
     
     def test_mcp_memory_query(self):
         """Test MCP memory_query tool"""
-        # First write a memory
-        self.send_mcp_request(
-            "tools/call", 
-            tool_name="memory_write",
-            tool_args={
+        # Write then query, pipelined over the same session
+        (_, response), stderr = self.send_mcp_pipeline([
+            ("memory_write", {
                 "type": "note",
                 "summary": "Query test note",
                 "detail": "This is for query testing"
-            }
-        )
-        
-        # Then query it
-        response, stderr = self.send_mcp_request(
-            "tools/call", 
-            tool_name="memory_query",
-            tool_args={"query": "query test"}
-        )
-        
+            }),
+            ("memory_query", {"query": "query test"}),
+        ])
+
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-        self.assertIn("Query test note", content_text)
+        self._assert_content_contains(response, "Query test note")
     
     def test_mcp_memory_recent(self):
         """Test MCP memory_recent tool"""
-        # Write a memory first
-        self.send_mcp_request(
-            "tools/call", 
-            tool_name="memory_write",
-            tool_args={
+        # Write then list, pipelined over the same session
+        (_, response), stderr = self.send_mcp_pipeline([
+            ("memory_write", {
                 "type": "note",
                 "summary": "Recent test note"
-            }
-        )
-        
-        # Get recent memories
-        response, stderr = self.send_mcp_request(
-            "tools/call", 
-            tool_name="memory_recent",
-            tool_args={}
-        )
-        
+            }),
+            ("memory_recent", {}),
+        ])
+
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-        self.assertIn("Recent test note", content_text)
+        self._assert_content_contains(response, "Recent test note")
     
     def test_mcp_memory_stats(self):
         """Test MCP memory_stats tool"""
@@ -264,9 +438,7 @@ class TinyMemMCPTestCase(unittest.TestCase):
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-        self.assertIn("Memory Statistics", content_text)
-        self.assertIn("Total memories:", content_text)
+        self._assert_content_contains(response, "Memory Statistics", "Total memories:")
     
     def test_mcp_memory_health(self):
         """Test MCP memory_health tool"""
@@ -279,9 +451,7 @@ class TinyMemMCPTestCase(unittest.TestCase):
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-        self.assertIn("HEALTHY", content_text)
-        self.assertIn("Database connectivity: OK", content_text)
+        self._assert_content_contains(response, "HEALTHY", "Database connectivity: OK")
     
     def test_mcp_memory_doctor(self):
         """Test MCP memory_doctor tool"""
@@ -294,8 +464,7 @@ class TinyMemMCPTestCase(unittest.TestCase):
         self.assertIsNotNone(response, f"Failed to get valid response: {stderr}")
         self.assertIn("result", response)
         self.assertIn("content", response["result"])
-        content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-        self.assertIn("tinyMem Diagnostics Report", content_text)
+        self._assert_content_contains(response, "tinyMem Diagnostics Report")
     
     def test_mcp_invalid_tool(self):
         """Test MCP with invalid tool name"""
@@ -312,19 +481,14 @@ class TinyMemMCPTestCase(unittest.TestCase):
     def test_mcp_memory_ralph_repair(self):
         """memory_ralph should run the repair loop and write a patch file."""
         patch_file = "ralph_patch.txt"
-        try:
-            stub = StubLLMServer(chat_response=lambda path, body: self._ralph_chat_response(path, body, patch_file))
-        except PermissionError as exc:
-            self.skipTest(f"Cannot bind stub server: {exc}")
-        stub.start()
-        env = {
-            "TINYMEM_LLM_BASE_URL": stub.base_url,
-            "TINYMEM_COVE_ENABLED": "false",
-            "TINYMEM_SEMANTIC_ENABLED": "false",
-            "TINYMEM_COVE_RECALL_FILTER_ENABLED": "false",
-        }
+        with self._stub_chat(lambda path, body: self._ralph_chat_response(path, body, patch_file)) as base_url:
+            env = {
+                "TINYMEM_LLM_BASE_URL": base_url,
+                "TINYMEM_COVE_ENABLED": "false",
+                "TINYMEM_SEMANTIC_ENABLED": "false",
+                "TINYMEM_COVE_RECALL_FILTER_ENABLED": "false",
+            }
 
-        try:
             args = {
                 "task": "Fix patch file",
                 "command": "sh -c 'exit 1'",
@@ -356,66 +520,39 @@ class TinyMemMCPTestCase(unittest.TestCase):
             text = response["result"]["content"][0]["text"]
             result_obj = json.loads(text)
             self.assertEqual(result_obj["status"], "success")
-            self.assertTrue(os.path.exists(patch_file))
-            with open(patch_file, "r") as f:
+            patch_path = os.path.join(self.temp_dir, patch_file)
+            self.assertTrue(os.path.exists(patch_path))
+            with open(patch_path, "r") as f:
                 self.assertIn("Ralph repair output", f.read())
-        finally:
-            stub.stop()
 
     def test_mcp_memory_query_with_cove_filter(self):
         """memory_query should filter out low-confidence items when CoVe recall filtering runs."""
-        try:
-            stub = StubLLMServer(chat_response=self._cove_chat_response)
-        except PermissionError as exc:
-            self.skipTest(f"Cannot bind stub server: {exc}")
-        stub.start()
-
-        env = {
-            "TINYMEM_LLM_BASE_URL": stub.base_url,
-            "TINYMEM_COVE_ENABLED": "true",
-            "TINYMEM_COVE_RECALL_FILTER_ENABLED": "true",
-            "TINYMEM_SEMANTIC_ENABLED": "false",
-        }
+        with self._stub_chat(self._cove_chat_response) as base_url:
+            env = {
+                "TINYMEM_LLM_BASE_URL": base_url,
+                "TINYMEM_COVE_ENABLED": "true",
+                "TINYMEM_COVE_RECALL_FILTER_ENABLED": "true",
+                "TINYMEM_SEMANTIC_ENABLED": "false",
+            }
 
-        try:
             summaries = ["First note", "Second note"]
-            for summary in summaries:
-                self.send_mcp_request(
-                    "tools/call",
-                    tool_name="memory_write",
-                    tool_args={
-                        "type": "note",
-                        "summary": summary,
-                        "detail": f"Detail for {summary}",
-                    },
-                    env=env,
-                )
+            calls = [("memory_write", {
+                "type": "note",
+                "summary": summary,
+                "detail": f"Detail for {summary}",
+            }) for summary in summaries]
+            calls.append(("memory_query", {"query": "note", "limit": 5}))
 
-            response, stderr = self.send_mcp_request(
-                "tools/call",
-                tool_name="memory_query",
-                tool_args={"query": "note", "limit": 5},
-                env=env,
-            )
+            responses, stderr = self.send_mcp_pipeline(calls, env=env)
+            response = responses[-1]
 
             self.assertIsNotNone(response, f"Memory query failed: {stderr}")
-            content_text = " ".join([item.get("text", "") for item in response["result"]["content"]])
-            self.assertIn("First note", content_text)
-            self.assertIn("Second note", content_text)
-
-        finally:
-            stub.stop()
+            self._assert_content_contains(response, "First note", "Second note")
 
 
 def run_mcp_tests():
-    """Run the MCP test suite"""
-    loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TinyMemMCPTestCase)
-    
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    return result.wasSuccessful()
+    """Run the MCP test suite on a thread pool; tests are isolated per tmpdir"""
+    return run_parallel(TinyMemMCPTestCase)
 
 
 if __name__ == "__main__":